@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Kernels Numba des indicateurs (EMA, RSI et ATR de Wilder, SuperTrend).
+Chaque kernel parcourt une seule fois des tableaux float64 et renvoie l'état final
+(valeurs brutes des récurrences) pour amorcer l'état incrémental des scripts de surveillance ;
+compute_all_last fusionne EMA, RSI et ATR 4H dans une même boucle.
+Les récurrences sont identiques aux mises à jour bougie par bougie des scripts :
+  - EMA : moyenne simple des `length` premières valeurs, puis e = α * x + (1 - α) * e_prev.
+  - RMA de Wilder : moyenne simple des `length` premiers échantillons, puis r = (r_prev * (n - 1) + x) / n.
+supertrend_step fait avancer le SuperTrend d'une bougie sur l'état persisté (cycles à chaud).
+Sans Numba installé, les kernels s'exécutent tels quels en Python (amorçage seulement, ~100 bougies).
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # Numba optionnel : mêmes boucles exécutées en Python sur les tableaux NumPy
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Décorateur identité (remplace numba.njit, avec ou sans options)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def compute_all_last(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    ema_len: int,
+    rsi_len: int,
+    atr_len: int,
+) -> Tuple[float, float, float, float, float, float]:
+    """
+    EMA, RSI et ATR de Wilder fusionnés en une seule passe sur (high, low, close).
+    Renvoie (ema, avg_gain, avg_loss, atr, rsi, prev_rsi) après la dernière bougie :
+    EMA = moyenne courante tant que len(close) < ema_len ; rsi / prev_rsi (bougie précédente,
+    pour le croisement) = NaN tant que l'amorçage n'est pas complet ; ATR = NaN si moins de deux bougies.
+    """
+    n = close.shape[0]
+    if n == 0:
+        return np.nan, np.nan, np.nan, np.nan, np.nan, np.nan
+    alpha = 2.0 / (ema_len + 1)
+    ema = close[0]
+    avg_gain = np.nan
+    avg_loss = np.nan
+    atr = np.nan
+    rsi = np.nan
+    prev_rsi = np.nan
+    if n >= 2:
+        avg_gain = 0.0
+        avg_loss = 0.0
+        atr = 0.0
+    for i in range(1, n):
+        c = close[i]
+        prev_close = close[i - 1]
+        k = i + 1
+        if k <= ema_len:
+            ema = (ema * (k - 1) + c) / k
+        else:
+            ema = alpha * c + (1 - alpha) * ema
+        change = c - prev_close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        m = min(i, rsi_len)
+        avg_gain = (avg_gain * (m - 1) + gain) / m
+        avg_loss = (avg_loss * (m - 1) + loss) / m
+        prev_rsi = rsi
+        rsi = np.nan
+        if i >= rsi_len and avg_gain + avg_loss > 0:
+            rsi = 100.0 * avg_gain / (avg_gain + avg_loss)
+        true_range = max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+        m = min(i, atr_len)
+        atr = (atr * (m - 1) + true_range) / m
+    return ema, avg_gain, avg_loss, atr, rsi, prev_rsi
+
+
+@njit(cache=True)
+def supertrend_step(
+    prev_upper: float,
+    prev_lower: float,
+    prev_dir: float,
+    high: float,
+    low: float,
+    close: float,
+    atr: float,
+    multiplier: float,
+) -> Tuple[float, float, float]:
+    """
+    Une bougie de SuperTrend (règles pandas-ta) : (bande haute, bande basse, direction).
+    La direction bascule quand la clôture franchit la bande finale précédente ; sinon elle est
+    conservée et la bande active ne recule pas. Sans fastmath : bandes précédentes NaN
+    (ATR non amorcé) → aucune bascule ni report.
+    """
+    hl2 = (high + low) / 2
+    upper = hl2 + multiplier * atr
+    lower = hl2 - multiplier * atr
+    direction = prev_dir
+    if close > prev_upper:
+        direction = 1.0
+    elif close < prev_lower:
+        direction = -1.0
+    else:
+        if direction > 0 and lower < prev_lower:
+            lower = prev_lower
+        if direction < 0 and upper > prev_upper:
+            upper = prev_upper
+    return upper, lower, direction
+
+
+# Sans fastmath : Numba compilerait alors supertrend_step avec les mêmes drapeaux (NaN non garantis)
+@njit(cache=True)
+def supertrend_dir_last(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    length: int,
+    multiplier: float,
+) -> Tuple[float, float, float, float]:
+    """
+    (direction, bande haute, bande basse, atr) du SuperTrend après la dernière bougie,
+    avec la règle de report des bandes finales de pandas-ta. Les bandes valent NaN
+    tant que l'ATR n'est pas amorcé (direction = 1 par défaut).
+    """
+    n = close.shape[0]
+    direction = 1.0
+    upper = np.nan
+    lower = np.nan
+    atr = np.nan
+    if n < 2:
+        return direction, upper, lower, atr
+    atr = 0.0
+    for i in range(1, n):
+        true_range = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        m = min(i, length)
+        atr = (atr * (m - 1) + true_range) / m
+        if i < length:
+            continue
+        if i == length:
+            # Premières bandes : rien à comparer, direction conservée
+            hl2 = (high[i] + low[i]) / 2
+            upper = hl2 + multiplier * atr
+            lower = hl2 - multiplier * atr
+        else:
+            upper, lower, direction = supertrend_step(
+                upper, lower, direction, high[i], low[i], close[i], atr, multiplier,
+            )
+    return direction, upper, lower, atr
+
+
+def warmup() -> None:
+    """Compile les kernels (ou les recharge depuis le cache disque) sur un petit tableau."""
+    x = np.linspace(1.0, 2.0, 32)
+    compute_all_last(x + 0.1, x - 0.1, x, 3, 3, 3)
+    supertrend_dir_last(x + 0.1, x - 0.1, x, 3, 3.0)
+    supertrend_step(2.1, 1.9, 1.0, 2.1, 1.9, 2.0, 0.1, 3.0)
+
+
+if NUMBA_AVAILABLE:
+    try:
+        warmup()
+    except Exception as e:  # compilation différée au premier appel
+        logger.warning("Pré-compilation des kernels impossible: %s", e)
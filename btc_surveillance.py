@@ -5,22 +5,39 @@ Stratégie :
   - Filtre Daily : SuperTrend (10, 3) ; pas de trade si Short.
   - Signal 4H : Prix > EMA 50 + crossover RSI > 45.
   - Sortie : Trailing Stop = close - (3 * ATR(14)), pas de TP fixe.
-  - Persistance : suivi du trade ouvert dans le CSV, mise à jour de Current_SL à chaque bougie 4H.
+  - Persistance : journal CSV append-only (ouverture / clôture) ; le trade ouvert et son Current_SL,
+    mis à jour à chaque bougie 4H, sont suivis dans open_trade_btc.json.
+  - Indicateurs incrémentaux : état (EMA, RMA de Wilder, SuperTrend) persisté en JSON,
+    amorcé par les kernels Numba (_kernels.py), puis seules les nouvelles bougies closes
+    sont intégrées à chaque cycle.
 Journal CSV + notification Telegram. Aucun credential privé (lecture seule).
 """
 
 import asyncio
+import contextlib
+import csv
+import functools
+import json
+import math
 import os
+import random
+import shutil
 import sys
+import tempfile
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
 
-import ccxt
-import pandas as pd
-import pandas_ta as ta
-from dotenv import load_dotenv
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+import ccxt.async_support as ccxt_a
+import numpy as np
+
+import _kernels
 
 # -----------------------------------------------------------------------------
 # Constantes
@@ -38,6 +55,10 @@ ATR_TRAILING_MULTIPLIER = 3
 SL_CANDLES = 3
 LOOKBACK_4H = 120
 LOOKBACK_1D = 250
+# Bougies récupérées à chaud (état déjà amorcé) : nouvelles bougies closes + bougie en cours
+# (3 en 4H pour le SL initial sur les 3 derniers plus bas ; 2 en Daily, une clôture par jour)
+LIMIT_WARM_4H = 3
+LIMIT_WARM_1D = 2
 
 # Gestion du risque (1% de 5000€ = 50€) — surchargeables par variables d'environnement
 CAPITAL_EUR = int(os.getenv("CAPITAL_EUR", "500"))
@@ -47,8 +68,35 @@ RISQUE_EUROS = int(os.getenv("RISQUE_EUROS", str(_default_risque)))
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 # Charger .env tôt pour que CAPITAL_EUR / RISQUE_* / TELEGRAM_* soient disponibles
-load_dotenv(SCRIPT_DIR / ".env")
+# (python-dotenv importé seulement si le fichier existe : rien à faire en CI / conteneur)
+ENV_PATH = SCRIPT_DIR / ".env"
+if ENV_PATH.is_file():
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_PATH)
 CSV_PATH = SCRIPT_DIR / "journal_trading.csv"
+# État vivant du trade ouvert (Current_SL mis à jour à chaque bougie), propre au symbole ;
+# le journal reste append-only
+OPEN_TRADE_PATH = SCRIPT_DIR / "open_trade_btc.json"
+# Verrou consultatif partagé par le journal et les états de trade ouvert (--once concurrent de la boucle)
+LOCK_PATH = CSV_PATH.with_suffix(".lock")
+# Taille des blocs lus à rebours pour trouver la dernière ligne du journal
+TAIL_BLOCK_SIZE = 4096
+# Dernier parsing du journal ({"key": (chemin, mtime_ns, taille), "val": trade ou None})
+_csv_cache: dict = {}
+# Bot Telegram partagé entre les cycles et ses clients HTTPX (voir _get_telegram_bot)
+_BOT = None
+_BOT_REQUESTS: tuple = ()
+# État des indicateurs (dernière bougie close intégrée), propre au symbole
+STATE_PATH = SCRIPT_DIR / "indicator_state_btc.json"
+# Définition du marché SYMBOL (cache de load_markets), rafraîchie au-delà de MARKETS_MAX_AGE
+MARKETS_PATH = SCRIPT_DIR / "markets_btc.json"
+MARKETS_MAX_AGE = 24 * 3600
+# Date (time.time()) des marchés chargés dans l'exchange : mtime du cache injecté ou dernier load_markets
+_markets_loaded_at: Optional[float] = None
+
+# Champs OHLCV CCXT (une colonne float64 par champ)
+OHLCV_FIELDS = ("ts", "open", "high", "low", "close", "volume")
 
 # Colonnes CSV (avec Current_SL pour le trailing)
 CSV_COLUMNS = [
@@ -70,131 +118,464 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_exchange() -> ccxt.Exchange:
-    """Retourne une instance CCXT Binance (API publique, pas de clés)."""
-    exchange = ccxt.gateio({"options": {"defaultType": "spot"}})
-    exchange.load_markets()
+@contextlib.contextmanager
+def _journal_lock() -> Iterator[None]:
+    """Verrou exclusif (fcntl.flock sous POSIX, msvcrt.locking sous Windows) sur LOCK_PATH."""
+    with open(LOCK_PATH, "a+") as f:
+        if os.name == "nt":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _atomic_write(path: Path, write: Callable[[TextIO], None]) -> None:
+    """
+    Écrit `path` dans un fichier temporaire unique (mkstemp, même dossier) puis os.replace :
+    jamais de fichier tronqué ou entrelacé, même si deux processus écrivent en même temps.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    tmp = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crée le fichier en 0600 : garder les droits du fichier remplacé
+        try:
+            shutil.copymode(path, tmp)
+        except OSError:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _markets_cache_fresh() -> bool:
+    """True si le cache disque du marché existe et a moins de MARKETS_MAX_AGE secondes."""
+    try:
+        return time.time() - MARKETS_PATH.stat().st_mtime < MARKETS_MAX_AGE
+    except OSError:
+        return False
+
+
+def save_markets_cache(exchange: ccxt_a.Exchange) -> None:
+    """Persiste la seule définition du marché SYMBOL (après un load_markets réseau)."""
+    if not exchange.markets or SYMBOL not in exchange.markets:
+        return
+    try:
+        market = exchange.markets[SYMBOL]
+        _atomic_write(MARKETS_PATH, lambda f: json.dump({SYMBOL: market}, f))
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Écriture cache marchés: %s", e)
+
+
+@functools.lru_cache(maxsize=None)
+def get_exchange() -> ccxt_a.Exchange:
+    """
+    Retourne l'instance CCXT asynchrone unique (API publique, pas de clés), réutilisée d'un cycle à l'autre.
+    Si le cache disque (MARKETS_PATH) est frais, le marché est injecté via set_markets() ;
+    sinon refresh_markets() le télécharge au premier cycle.
+    """
+    global _markets_loaded_at
+    exchange = ccxt_a.gateio({"options": {"defaultType": "spot"}})
+    if _markets_cache_fresh():
+        try:
+            with open(MARKETS_PATH, encoding="utf-8") as f:
+                exchange.set_markets(json.load(f))
+            _markets_loaded_at = MARKETS_PATH.stat().st_mtime
+        except Exception as e:
+            logger.warning("Lecture cache marchés: %s", e)
     return exchange
 
 
-def get_indicators(
-    exchange: ccxt.Exchange,
-) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[float], bool]:
+async def refresh_markets(exchange: ccxt_a.Exchange) -> None:
+    """
+    Recharge les marchés par le réseau (load_markets(reload=True)) s'ils sont absents ou ont plus
+    de MARKETS_MAX_AGE secondes, puis réécrit le cache disque. En cas d'échec, les marchés en
+    mémoire sont conservés (ou chargés par CCXT au premier fetch).
+    """
+    global _markets_loaded_at
+    if (
+        exchange.markets
+        and _markets_loaded_at is not None
+        and time.time() - _markets_loaded_at < MARKETS_MAX_AGE
+    ):
+        return
+    try:
+        await exchange.load_markets(reload=True)
+    except Exception as e:
+        logger.warning("Chargement marchés: %s", e)
+        return
+    _markets_loaded_at = time.time()
+    save_markets_cache(exchange)
+
+
+def load_indicator_state() -> dict:
+    """Charge l'état persisté des indicateurs ({"4h": {...}, "1d": {...}}), vide si absent ou illisible."""
+    if not STATE_PATH.exists():
+        return {"4h": {}, "1d": {}}
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            state = json.load(f)
+        return {"4h": state.get("4h", {}), "1d": state.get("1d", {})}
+    except (OSError, ValueError) as e:
+        logger.warning("Lecture état indicateurs: %s", e)
+        return {"4h": {}, "1d": {}}
+
+
+def save_indicator_state(state: dict) -> None:
+    """Persiste l'état des indicateurs à côté du journal CSV."""
+    try:
+        _atomic_write(STATE_PATH, lambda f: json.dump(state, f))
+    except OSError as e:
+        logger.warning("Écriture état indicateurs: %s", e)
+
+
+def _rma(prev: Optional[float], x: float, k: int, length: int) -> float:
+    """
+    Moyenne de Wilder (RMA) pour le k-ième échantillon : moyenne simple tant que k <= length
+    (amorçage), puis r = (r_prev * (n - 1) + x) / n.
+    """
+    if prev is None or k <= 1:
+        return x
+    n = min(k, length)
+    return (prev * (n - 1) + x) / n
+
+
+def _update_ema(state: dict, high: float, low: float, close: float, prev_close: Optional[float]) -> None:
+    """EMA 50 : amorçage par SMA des 50 premières clôtures, puis e = α * x + (1 - α) * e_prev."""
+    k = state["n"]
+    if k <= EMA_SLOW:
+        state["ema50"] = _rma(state.get("ema50"), close, k, EMA_SLOW)
+    else:
+        alpha = 2.0 / (EMA_SLOW + 1)
+        state["ema50"] = alpha * close + (1 - alpha) * state["ema50"]
+
+
+def _update_rsi(state: dict, high: float, low: float, close: float, prev_close: Optional[float]) -> None:
+    """RSI(14) : moyennes de Wilder des hausses et des baisses (α = 1/14)."""
+    if prev_close is None:
+        return
+    change = close - prev_close
+    k = state["n"] - 1
+    state["rsi_avg_gain"] = _rma(state.get("rsi_avg_gain"), max(change, 0.0), k, RSI_LENGTH)
+    state["rsi_avg_loss"] = _rma(state.get("rsi_avg_loss"), max(-change, 0.0), k, RSI_LENGTH)
+
+
+def _update_atr(
+    state: dict,
+    high: float,
+    low: float,
+    close: float,
+    prev_close: Optional[float],
+    length: int = ATR_LENGTH,
+) -> None:
+    """ATR : moyenne de Wilder du True Range (α = 1/length)."""
+    if prev_close is None:
+        return
+    true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+    state["atr"] = _rma(state.get("atr"), true_range, state["n"] - 1, length)
+
+
+def _update_supertrend(state: dict, high: float, low: float, close: float, prev_close: Optional[float]) -> None:
+    """
+    SuperTrend (10, 3) : une étape du kernel _kernels.supertrend_step (bandes HL2 ± 3 * ATR(10),
+    règle de report des bandes finales de pandas-ta) sur l'état persisté.
     """
-    Récupère les OHLCV 4H et 1D, calcule EMA 50, RSI(14), ATR(14) en 4H et SuperTrend (10,3) en Daily.
+    atr = state["atr"] if state["n"] - 1 >= SUPERTREND_LENGTH else math.nan
+    upper, lower, direction = _kernels.supertrend_step(
+        state.get("st_upper", math.nan),
+        state.get("st_lower", math.nan),
+        float(state.get("st_dir", 1)),
+        high, low, close, atr, float(SUPERTREND_MULTIPLIER),
+    )
+    state["st_upper"] = upper
+    state["st_lower"] = lower
+    state["st_dir"] = int(direction)
+
+
+def _step_4h(state: dict, high: float, low: float, close: float) -> None:
+    """Intègre une bougie 4H dans l'état (EMA 50, RSI 14, ATR 14)."""
+    prev_close = state.get("close")
+    state["n"] = state.get("n", 0) + 1
+    _update_ema(state, high, low, close, prev_close)
+    _update_rsi(state, high, low, close, prev_close)
+    _update_atr(state, high, low, close, prev_close)
+    state["close"] = close
+
+
+def _step_1d(state: dict, high: float, low: float, close: float) -> None:
+    """Intègre une bougie Daily dans l'état (ATR 10 + SuperTrend)."""
+    prev_close = state.get("close")
+    state["n"] = state.get("n", 0) + 1
+    _update_atr(state, high, low, close, prev_close, length=SUPERTREND_LENGTH)
+    _update_supertrend(state, high, low, close, prev_close)
+    state["close"] = close
+
+
+def _snapshot_4h(state: dict) -> Tuple[float, float, float]:
+    """(ema50, rsi, atr) pour la dernière bougie intégrée ; NaN tant que l'amorçage n'est pas complet."""
+    n = state.get("n", 0)
+    ema50 = state["ema50"] if n >= EMA_SLOW else math.nan
+    rsi = math.nan
+    if n - 1 >= RSI_LENGTH:
+        gain, loss = state["rsi_avg_gain"], state["rsi_avg_loss"]
+        if gain + loss > 0:
+            rsi = 100.0 * gain / (gain + loss)
+    atr = state["atr"] if n - 1 >= ATR_LENGTH else math.nan
+    return ema50, rsi, atr
+
+
+def _snapshot_1d(state: dict) -> Tuple[float]:
+    """(supertrend_dir,) pour la dernière bougie intégrée ; NaN tant que l'ATR n'est pas amorcé."""
+    if state.get("n", 0) - 1 < SUPERTREND_LENGTH:
+        return (math.nan,)
+    return (float(state["st_dir"]),)
+
+
+def _fold_ohlcv(state: dict, ohlcv: list, step, snapshot) -> list:
+    """
+    Intègre dans `state` les bougies closes postérieures à state["last_ts"] et renvoie,
+    pour chaque bougie de `ohlcv`, les valeurs d'indicateurs (NaN si inconnues).
+    La dernière bougie (en cours de formation) est évaluée sur une copie de l'état
+    et n'est jamais persistée.
+    """
+    unknown = tuple(math.nan for _ in snapshot({}))
+    values = []
+    for i, (ts, _open, high, low, close, _volume) in enumerate(ohlcv):
+        last_ts = state.get("last_ts")
+        if last_ts is not None and ts < last_ts:
+            values.append(unknown)
+        elif ts == last_ts:
+            values.append(snapshot(state))
+        elif i == len(ohlcv) - 1:
+            preview = dict(state)
+            step(preview, float(high), float(low), float(close))
+            values.append(snapshot(preview))
+        else:
+            step(state, float(high), float(low), float(close))
+            state["last_ts"] = ts
+            values.append(snapshot(state))
+    return values
+
+
+def _seed_4h(state: dict, closed: np.ndarray) -> None:
+    """Amorce l'état 4H en une passe (kernel Numba fusionné) sur les bougies closes (lignes OHLCV float64)."""
+    # Colonnes contiguës : même signature (layout 'C') que _kernels.warmup, pas de seconde compilation
+    high, low, close = np.ascontiguousarray(closed[:, 2:5].T)
+    ema, avg_gain, avg_loss, atr, _rsi, _prev_rsi = _kernels.compute_all_last(
+        high, low, close, EMA_SLOW, RSI_LENGTH, ATR_LENGTH,
+    )
+    state["ema50"] = float(ema)
+    state["rsi_avg_gain"] = float(avg_gain)
+    state["rsi_avg_loss"] = float(avg_loss)
+    state["atr"] = float(atr)
+
+
+def _seed_1d(state: dict, closed: np.ndarray) -> None:
+    """Amorce l'état Daily (ATR 10 + SuperTrend) en une passe (kernel Numba)."""
+    # Colonnes contiguës : même signature (layout 'C') que _kernels.warmup, pas de seconde compilation
+    high, low, close = np.ascontiguousarray(closed[:, 2:5].T)
+    direction, upper, lower, atr = _kernels.supertrend_dir_last(
+        high, low, close, SUPERTREND_LENGTH, float(SUPERTREND_MULTIPLIER),
+    )
+    state["st_dir"] = int(direction)
+    state["st_upper"] = float(upper)
+    state["st_lower"] = float(lower)
+    state["atr"] = float(atr)
+
+
+async def _fetch_folded(
+    exchange: ccxt_a.Exchange,
+    timeframe: str,
+    lookback: int,
+    limit_warm: int,
+    state: dict,
+    seed,
+    step,
+    snapshot,
+    closed_only: bool = False,
+) -> Tuple[list, list]:
+    """
+    À chaud : récupère `limit_warm` bougies (davantage si des cycles ont été sautés depuis
+    la dernière bougie connue, pour la rattraper sans trou) et intègre les nouvelles, si elles
+    prolongent la dernière bougie connue sans trou.
+    Avec `closed_only`, seules les bougies closes sont renvoyées (pas d'aperçu de la bougie en cours) ;
+    tant qu'aucune nouvelle bougie n'a pu clôturer depuis la dernière connue, aucune requête n'est faite : la dernière bougie close de l'état est renvoyée seule
+    (clôture connue, autres prix NaN).
+    À froid (pas d'état, retard supérieur à `lookback`, ou trou depuis la dernière bougie connue) :
+    récupère `lookback` bougies et réamorce l'état depuis zéro via `seed` sur les bougies closes.
+    """
+    last_ts = state.get("last_ts")
+    if last_ts is not None:
+        timeframe_ms = ccxt_a.Exchange.parse_timeframe(timeframe) * 1000
+        now_ms = time.time() * 1000
+        if closed_only and now_ms < last_ts + 2 * timeframe_ms:
+            row = [last_ts, math.nan, math.nan, math.nan, state["close"], math.nan]
+            return [row], [snapshot(state)]
+        # Bougies ouvertes depuis la dernière connue (closes manquées + bougie en cours) :
+        # rattrapage incrémental, la bougie last_ts déjà intégrée n'est pas retéléchargée
+        limit = max(limit_warm, int(now_ms - last_ts) // timeframe_ms)
+        if limit <= lookback:
+            ohlcv = await exchange.fetch_ohlcv(SYMBOL, timeframe, limit=limit)
+            if ohlcv and ohlcv[0][0] <= last_ts + timeframe_ms:
+                values = _fold_ohlcv(state, ohlcv, step, snapshot)
+                return (ohlcv[:-1], values[:-1]) if closed_only else (ohlcv, values)
+        logger.info("État %s discontinu, réamorçage sur %d bougies", timeframe, lookback)
+    state.clear()
+    ohlcv = await exchange.fetch_ohlcv(SYMBOL, timeframe, limit=lookback)
+    if len(ohlcv) > 1:
+        closed = np.asarray(ohlcv[:-1], dtype=np.float64)
+        seed(state, closed)
+        state["n"] = len(closed)
+        state["close"] = float(closed[-1, 4])
+        state["last_ts"] = ohlcv[-2][0]
+    values = _fold_ohlcv(state, ohlcv, step, snapshot)
+    return (ohlcv[:-1], values[:-1]) if closed_only else (ohlcv, values)
+
+
+def _ohlcv_arrays(ohlcv: list, columns: list, values: list) -> Dict[str, np.ndarray]:
+    """
+    OHLCV CCXT en Structure-of-Arrays : un tableau float64 par champ (OHLCV_FIELDS, ts en ms),
+    complété des colonnes d'indicateurs.
+    """
+    arr = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(OHLCV_FIELDS))
+    bars = dict(zip(OHLCV_FIELDS, arr.T))
+    indicators = np.asarray(values, dtype=np.float64).reshape(len(arr), len(columns))
+    bars.update(zip(columns, indicators.T))
+    return bars
+
+
+async def get_daily_state(exchange: ccxt_a.Exchange, state: dict) -> Tuple[Dict[str, np.ndarray], bool]:
+    """
+    SuperTrend (10,3) Daily, mis à jour de façon incrémentale depuis state["1d"] (voir load_indicator_state).
+    Le filtre porte toujours sur la dernière bougie Daily close (jamais sur la bougie en cours) ;
+    le Daily n'est téléchargé qu'après une nouvelle clôture journalière, entre-temps la dernière
+    bougie close de l'état est réutilisée.
 
     Returns:
-        (df_4h, df_1d, prix_actuel, ok)
+        (bars_1d, ok) — bars_1d : colonnes NumPy (voir _ohlcv_arrays)
     """
     try:
-        ohlcv_4h = exchange.fetch_ohlcv(SYMBOL, TIMEFRAME_4H, limit=LOOKBACK_4H)
-        df_4h = pd.DataFrame(
-            ohlcv_4h,
-            columns=["timestamp", "open", "high", "low", "close", "volume"],
-        )
-        df_4h["timestamp"] = pd.to_datetime(df_4h["timestamp"], unit="ms")
-        df_4h.set_index("timestamp", inplace=True)
-        close_4h = df_4h["close"]
-
-        ohlcv_1d = exchange.fetch_ohlcv(SYMBOL, TIMEFRAME_1D, limit=LOOKBACK_1D)
-        df_1d = pd.DataFrame(
-            ohlcv_1d,
-            columns=["timestamp", "open", "high", "low", "close", "volume"],
-        )
-        df_1d["timestamp"] = pd.to_datetime(df_1d["timestamp"], unit="ms")
-        df_1d.set_index("timestamp", inplace=True)
-
-        # Indicateurs 4H
-        df_4h["ema50"] = ta.ema(close_4h, length=EMA_SLOW)
-        df_4h["rsi"] = ta.rsi(close_4h, length=RSI_LENGTH)
-        df_4h["atr"] = ta.atr(df_4h["high"], df_4h["low"], close_4h, length=ATR_LENGTH)
-
-        # SuperTrend (10, 3) Daily
-        st = ta.supertrend(
-            df_1d["high"], df_1d["low"], df_1d["close"],
-            length=SUPERTREND_LENGTH, multiplier=SUPERTREND_MULTIPLIER,
+        ohlcv_1d, values_1d = await _fetch_folded(
+            exchange, TIMEFRAME_1D, LOOKBACK_1D, LIMIT_WARM_1D, state["1d"], _seed_1d, _step_1d, _snapshot_1d,
+            closed_only=True,
         )
-        if st is not None and not st.empty:
-            dir_col = [c for c in st.columns if c.startswith("SUPERTd_")]
-            if dir_col:
-                df_1d["supertrend_dir"] = st[dir_col[0]].values
+        bars_1d = _ohlcv_arrays(ohlcv_1d, ["supertrend_dir"], values_1d)
+        save_indicator_state(state)
+        return bars_1d, True
 
-        prix_actuel = float(close_4h.iloc[-1])
-        return df_4h, df_1d, prix_actuel, True
+    except Exception as e:
+        logger.exception("get_daily_state: %s", e)
+        return {}, False
+
+
+async def get_4h_state(
+    exchange: ccxt_a.Exchange,
+    state: dict,
+) -> Tuple[Dict[str, np.ndarray], Optional[float], bool]:
+    """
+    EMA 50, RSI(14) et ATR(14) en 4H, mis à jour de façon incrémentale depuis state["4h"] :
+    seules les lignes nouvelles (et la dernière bougie close connue) portent des valeurs.
+
+    Returns:
+        (bars_4h, prix_actuel, ok) — bars_4h : colonnes NumPy (voir _ohlcv_arrays)
+    """
+    try:
+        ohlcv_4h, values_4h = await _fetch_folded(
+            exchange, TIMEFRAME_4H, LOOKBACK_4H, LIMIT_WARM_4H, state["4h"], _seed_4h, _step_4h, _snapshot_4h,
+        )
+        bars_4h = _ohlcv_arrays(ohlcv_4h, ["ema50", "rsi", "atr"], values_4h)
+        save_indicator_state(state)
+        prix_actuel = float(bars_4h["close"][-1])
+        return bars_4h, prix_actuel, True
 
     except Exception as e:
-        logger.exception("get_indicators: %s", e)
-        return pd.DataFrame(), pd.DataFrame(), None, False
+        logger.exception("get_4h_state: %s", e)
+        return {}, None, False
 
 
-def is_supertrend_daily_long(df_1d: pd.DataFrame) -> bool:
+def is_supertrend_daily_long(bars_1d: Dict[str, np.ndarray]) -> bool:
     """True si le SuperTrend (10, 3) Daily est Long (haussier) sur la dernière bougie."""
-    if df_1d.empty or "supertrend_dir" not in df_1d.columns:
+    if "supertrend_dir" not in bars_1d or len(bars_1d["supertrend_dir"]) == 0:
         return False
-    if len(df_1d) < SUPERTREND_LENGTH + 2:
+    last_dir = float(bars_1d["supertrend_dir"][-1])
+    if math.isnan(last_dir):
         return False
-    last_dir = df_1d["supertrend_dir"].iloc[-1]
     return last_dir == 1
 
 
 def check_signal(
-    df_4h: pd.DataFrame,
-    df_1d: pd.DataFrame,
+    bars_4h: Dict[str, np.ndarray],
+    bars_1d: Dict[str, np.ndarray],
     prix_actuel: float,
 ) -> bool:
     """
     Filtre Daily : SuperTrend (10, 3) doit être Long (pas de trade si Short).
     Signal 4H : prix > EMA 50 + crossover RSI > 45 sur la dernière bougie.
     """
-    if df_4h.empty or df_1d.empty or prix_actuel is None:
+    if not bars_4h or not bars_1d or prix_actuel is None:
         return False
 
-    if not is_supertrend_daily_long(df_1d):
+    if not is_supertrend_daily_long(bars_1d):
         logger.info("Filtre Daily: SuperTrend (10,3) non Long - pas de signal")
         return False
 
-    if len(df_4h) < max(EMA_SLOW, RSI_LENGTH) + SL_CANDLES + 2:
+    if len(bars_4h["close"]) < SL_CANDLES:
         return False
 
-    last = df_4h.iloc[-1]
-    prev = df_4h.iloc[-2]
-    close = last["close"]
-    ema50 = last["ema50"]
+    close = float(bars_4h["close"][-1])
+    ema50 = float(bars_4h["ema50"][-1])
+    rsi_last = float(bars_4h["rsi"][-1])
+    rsi_prev = float(bars_4h["rsi"][-2])
+    if math.isnan(ema50) or math.isnan(rsi_last):
+        return False
     trend_ok = close > ema50
     if not trend_ok:
         logger.info("Pas de signal: close %.2f <= EMA50 %.2f", close, ema50)
         return False
 
-    # Crossover RSI au-dessus de 45 (précédent < 45 et actuel > 45)
-    rsi_prev = df_4h["rsi"].shift(1)
-    rsi_cross = (rsi_prev < RSI_CROSS_LEVEL) & (df_4h["rsi"] > RSI_CROSS_LEVEL)
-    crossover_ok = bool(rsi_cross.iloc[-1]) if pd.notna(rsi_cross.iloc[-1]) else False
+    # Crossover RSI au-dessus de 45 (précédent < 45 et actuel > 45), sur les deux derniers scalaires
+    crossover_ok = (
+        not math.isnan(rsi_prev)
+        and rsi_prev < RSI_CROSS_LEVEL
+        and rsi_last > RSI_CROSS_LEVEL
+    )
     if not crossover_ok:
-        logger.info("Pas de signal: pas de crossover RSI > 45 (RSI=%.1f)", last["rsi"])
+        logger.info("Pas de signal: pas de crossover RSI > 45 (RSI=%.1f)", rsi_last)
         return False
 
     logger.info(
         "Signal détecté: SuperTrend Daily Long, close > EMA50, RSI croise > 45 (RSI=%.1f)",
-        last["rsi"],
+        rsi_last,
     )
     return True
 
 
-def compute_trade_values(prix_entree: float, df_4h: pd.DataFrame) -> Optional[dict]:
+def compute_trade_values(prix_entree: float, low: np.ndarray) -> Optional[dict]:
     """
-    SL initial = plus bas des 3 dernières bougies 4H. Pas de TP (trailing stop).
-    Taille = risque 1% / (prix_entree - sl).
+    SL initial = plus bas des 3 dernières bougies 4H (tableau `low`). Pas de TP (trailing stop).
+    Taille = risque 1% / (prix_entree - sl) ; calcul purement scalaire.
     """
-    if df_4h.empty or len(df_4h) < SL_CANDLES:
+    if low is None or low.shape[0] < SL_CANDLES:
         return None
-    last_3 = df_4h.iloc[-SL_CANDLES:]
-    sl_initial = float(last_3["low"].min())
-    if prix_entree <= sl_initial:
+    sl_initial = float(low[-SL_CANDLES:].min())
+    if not prix_entree > sl_initial:
         logger.warning("SL initial (low 3 bougies) >= prix entree, trade ignoré")
         return None
     risque_euros = RISQUE_EUROS
     taille_position = risque_euros / (prix_entree - sl_initial)
-    pnl_perdant = (sl_initial - prix_entree) * taille_position
+    # (sl - entrée) * taille = -risque par construction
+    pnl_perdant = -float(risque_euros)
     return {
         "Prix_Entree": round(prix_entree, 2),
         "SL": round(sl_initial, 2),
@@ -206,34 +587,136 @@ def compute_trade_values(prix_entree: float, df_4h: pd.DataFrame) -> Optional[di
     }
 
 
+def _load_open_trade_state() -> Optional[dict]:
+    """État vivant du trade ouvert (OPEN_TRADE_PATH), ou None si absent/illisible."""
+    if not OPEN_TRADE_PATH.exists():
+        return None
+    try:
+        with open(OPEN_TRADE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Lecture état trade ouvert: %s", e)
+        return None
+
+
+def _save_open_trade_state(trade: dict) -> None:
+    """Écrit l'état vivant du trade ouvert (O(1), indépendant de la taille du journal), atomiquement."""
+    _atomic_write(OPEN_TRADE_PATH, lambda f: json.dump(trade, f))
+
+
+def _read_csv_tail() -> Tuple[str, Optional[str]]:
+    """
+    (en-tête, dernière ligne de données ou None) du journal, sans le lire en entier :
+    la fin du fichier est lue à rebours par blocs de TAIL_BLOCK_SIZE octets.
+    """
+    with open(CSV_PATH, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > data_start:
+            size = min(TAIL_BLOCK_SIZE, pos - data_start)
+            pos -= size
+            f.seek(pos)
+            buf = f.read(size) + buf
+            if b"\n" in buf.rstrip(b"\r\n"):
+                break
+    last = buf.rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+    return header.decode("utf-8"), (last.decode("utf-8") if last.strip() else None)
+
+
+def _parse_open_row_from_csv() -> Optional[dict]:
+    """Dernière ligne du journal si son Statut est OPEN (valeurs numériques converties), sinon None."""
+    header, line = _read_csv_tail()
+    if line is None:
+        return None
+    last = next(csv.DictReader([header, line]))
+    if str(last.get("Statut")).strip().upper() != "OPEN":
+        return None
+    for k in ["Prix_Entree", "SL", "Current_SL", "Taille_Position", "Risque_Euros", "PnL_Theorique_Perdant"]:
+        if k in last and last[k] is not None and str(last[k]).strip() != "":
+            try:
+                last[k] = float(last[k])
+            except (TypeError, ValueError):
+                pass
+    if last.get("Current_SL") is None or str(last["Current_SL"]).strip() == "":
+        last["Current_SL"] = last.get("SL")
+    # Index inconnu sans parcourir tout le journal
+    last["row_index"] = None
+    return last
+
+
 def get_open_trade_from_csv() -> Optional[dict]:
-    """Retourne le dernier trade avec Statut=OPEN (ou None)."""
-    if not CSV_PATH.exists():
+    """
+    Retourne le trade ouvert (ou None) : état vivant OPEN_TRADE_PATH s'il existe,
+    sinon dernière ligne du journal si son Statut est OPEN (journal antérieur ou état perdu).
+    Le journal est partagé entre symboles : si un autre symbole a un trade ouvert
+    (open_trade_<sym>.json), la ligne OPEN est la sienne et n'est pas reprise.
+    Le parsing du journal est mémorisé tant que (chemin, mtime_ns, taille) ne change pas.
+    """
+    trade = _load_open_trade_state()
+    if trade is not None:
+        return trade
+    if any(OPEN_TRADE_PATH.parent.glob("open_trade_*.json")):
         return None
     try:
-        df = pd.read_csv(CSV_PATH, encoding="utf-8")
-        if df.empty:
-            return None
-        open_rows = df[df["Statut"].astype(str).str.strip().str.upper() == "OPEN"]
-        if open_rows.empty:
-            return None
-        last = open_rows.iloc[-1].to_dict()
-        for k in ["Prix_Entree", "SL", "Current_SL", "Taille_Position", "Risque_Euros", "PnL_Theorique_Perdant"]:
-            if k in last and last[k] is not None and str(last[k]).strip() != "":
-                try:
-                    last[k] = float(last[k])
-                except (TypeError, ValueError):
-                    pass
-        if last.get("Current_SL") is None or (isinstance(last.get("Current_SL"), float) and pd.isna(last.get("Current_SL"))):
-            last["Current_SL"] = last.get("SL")
-        return last
-    except Exception as e:
-        logger.warning("Lecture CSV: %s", e)
+        st = CSV_PATH.stat()
+    except FileNotFoundError:
         return None
+    key = (str(CSV_PATH), st.st_mtime_ns, st.st_size)
+    if _csv_cache.get("key") != key:
+        try:
+            _csv_cache["val"] = _parse_open_row_from_csv()
+        except Exception as e:
+            logger.warning("Lecture CSV: %s", e)
+            return None
+        _csv_cache["key"] = key
+    val = _csv_cache["val"]
+    return dict(val) if val is not None else None
+
 
+def _append_journal_row(row: dict) -> int:
+    """
+    Ajoute une ligne au journal et renvoie son index (0 = première ligne de données).
+    Le journal est recopié dans un fichier temporaire complété puis remplacé atomiquement
+    (l'index est compté pendant la recopie) ; l'appelant doit détenir _journal_lock().
+    """
+    file_exists = CSV_PATH.exists()
+    lines = 0
+
+    def write(f: TextIO) -> None:
+        nonlocal lines
+        if file_exists:
+            with open(CSV_PATH, encoding="utf-8", newline="") as src:
+                for line in src:
+                    f.write(line)
+                    lines += 1
+        writer = csv.writer(f, lineterminator=os.linesep)
+        if not file_exists:
+            writer.writerow(CSV_COLUMNS)
+        writer.writerow(["" if row.get(c) is None else row[c] for c in CSV_COLUMNS])
+
+    _atomic_write(CSV_PATH, write)
+    _csv_cache.clear()
+    return max(lines - 1, 0)
+
+
+def _is_current_open_trade(open_trade: dict) -> bool:
+    """
+    À appeler sous _journal_lock() : True si `open_trade` est toujours le trade ouvert
+    (même Date / Prix_Entree), c.-à-d. qu'un autre processus ne l'a ni clôturé ni remplacé.
+    """
+    current = get_open_trade_from_csv()
+    return current is not None and all(
+        str(current.get(k)) == str(open_trade.get(k)) for k in ("Date", "Prix_Entree")
+    )
 
-def update_csv_new_trade(trade_row: dict) -> None:
-    """Ajoute une nouvelle ligne au journal (nouveau signal)."""
+
+def update_csv_new_trade(trade_row: dict) -> bool:
+    """
+    Ajoute une nouvelle ligne au journal (nouveau signal) et initialise l'état du trade ouvert.
+    Retourne False sans rien écrire si un trade a été ouvert entre-temps (autre processus).
+    """
     row = {
         "Date": trade_row.get("Date", datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")),
         "Type": "Long",
@@ -246,55 +729,107 @@ def update_csv_new_trade(trade_row: dict) -> None:
         "PnL_Theorique_Perdant": trade_row["PnL_Theorique_Perdant"],
         "Statut": "OPEN",
     }
-    df = pd.DataFrame([row], columns=CSV_COLUMNS)
-    file_exists = CSV_PATH.exists()
-    df.to_csv(
-        CSV_PATH,
-        mode="a",
-        header=not file_exists,
-        index=False,
-        encoding="utf-8",
-    )
+    with _journal_lock():
+        if get_open_trade_from_csv() is not None:
+            logger.warning("Trade déjà ouvert (autre processus), nouveau trade ignoré")
+            return False
+        row_index = _append_journal_row(row)
+        _save_open_trade_state({**row, "row_index": row_index})
     logger.info("Nouveau trade ajouté au journal: %s", CSV_PATH)
+    return True
 
 
-def update_csv_open_trade(current_sl: float, statut: str = "OPEN") -> None:
+def update_csv_open_trade(open_trade: dict, current_sl: float, statut: str = "OPEN") -> bool:
     """
-    Met à jour le dernier trade OPEN dans le CSV : Current_SL et éventuellement Statut.
-    statut = "OPEN" pour simple mise à jour du trailing, "CLOSED_SL" pour clôture.
+    Met à jour le trade ouvert : Current_SL et éventuellement Statut.
+    statut = "OPEN" pour simple mise à jour du trailing (état OPEN_TRADE_PATH uniquement),
+    "CLOSED_SL" pour clôture (ligne ajoutée au journal, état supprimé).
+    Retourne False sans rien écrire si le trade a été clôturé ou remplacé entre-temps (autre processus).
     """
-    if not CSV_PATH.exists():
-        return
     try:
-        df = pd.read_csv(CSV_PATH, encoding="utf-8")
-        if df.empty:
-            return
-        idx_open = df[df["Statut"].astype(str).str.strip().str.upper() == "OPEN"].index
-        if len(idx_open) == 0:
-            return
-        last_open_idx = idx_open[-1]
-        df.at[last_open_idx, "Current_SL"] = round(current_sl, 2)
-        df.at[last_open_idx, "Statut"] = statut
-        df.to_csv(CSV_PATH, index=False, encoding="utf-8")
-        logger.info("Journal mis à jour: Current_SL=%.2f, Statut=%s", current_sl, statut)
+        trade = {k: open_trade.get(k) for k in CSV_COLUMNS}
+        trade["row_index"] = open_trade.get("row_index")
+        trade["Current_SL"] = round(current_sl, 2)
+        trade["Statut"] = statut
+        with _journal_lock():
+            if not _is_current_open_trade(open_trade):
+                logger.warning("Trade clôturé ou remplacé (autre processus), mise à jour ignorée")
+                return False
+            if statut == "OPEN":
+                _save_open_trade_state(trade)
+            else:
+                trade["Date"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+                _append_journal_row(trade)
+                OPEN_TRADE_PATH.unlink(missing_ok=True)
+        if statut == "OPEN":
+            logger.info("Trade ouvert mis à jour: Current_SL=%.2f", current_sl)
+        else:
+            logger.info("Journal mis à jour: Current_SL=%.2f, Statut=%s", current_sl, statut)
+        return True
     except Exception as e:
-        logger.warning("Mise à jour CSV: %s", e)
+        logger.warning("Mise à jour trade ouvert: %s", e)
+        return False
 
 
-async def send_telegram_message(message: str) -> bool:
-    """Envoie un message Telegram via python-telegram-bot (API asynchrone)."""
-    try:
+def _get_telegram_bot(token: str):
+    """
+    Bot Telegram unique du processus (créé au premier envoi) : son HTTPXRequest garde la connexion
+    TCP/TLS ouverte d'un cycle à l'autre au lieu d'un nouveau client HTTPX par message.
+    """
+    global _BOT, _BOT_REQUESTS
+    if _BOT is None:
         from telegram import Bot
+        from telegram.request import HTTPXRequest
+
+        # Les deux clients HTTPX du Bot sont explicites pour être fermés par close_telegram_bot()
+        _BOT_REQUESTS = (
+            HTTPXRequest(connection_pool_size=4, read_timeout=5),
+            HTTPXRequest(connection_pool_size=1),
+        )
+        # Pas de Bot.initialize() : il ajouterait un appel get_me() sans utilité ici
+        # (Bot.shutdown() ne fermerait alors rien)
+        _BOT = Bot(token=token, request=_BOT_REQUESTS[0], get_updates_request=_BOT_REQUESTS[1])
+    return _BOT
+
 
+async def close_telegram_bot() -> None:
+    """Ferme les clients HTTPX du Bot partagé (envois et get_updates), à l'arrêt du script."""
+    global _BOT, _BOT_REQUESTS
+    if _BOT is None:
+        return
+    try:
+        for request in _BOT_REQUESTS:
+            try:
+                await request.shutdown()
+            except Exception as e:
+                logger.warning("Fermeture Bot Telegram: %s", e)
+    finally:
+        _BOT = None
+        _BOT_REQUESTS = ()
+
+
+async def send_telegram_messages(messages: List[str]) -> bool:
+    """
+    Envoie les messages d'un cycle via python-telegram-bot (API asynchrone) :
+    Bot partagé (_get_telegram_bot), envois concurrents dans la boucle d'événements courante.
+    """
+    try:
         token = os.getenv("TELEGRAM_BOT_TOKEN")
         chat_id = os.getenv("TELEGRAM_CHAT_ID")
         if not token or not chat_id:
             logger.warning("TELEGRAM_BOT_TOKEN ou TELEGRAM_CHAT_ID manquants, notification ignorée")
             return False
-        bot = Bot(token=token)
-        await bot.send_message(chat_id=chat_id, text=message)
-        logger.info("Notification Telegram envoyée")
-        return True
+        bot = _get_telegram_bot(token)
+        results = await asyncio.gather(
+            *(bot.send_message(chat_id=chat_id, text=message) for message in messages),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        for e in errors:
+            logger.error("Erreur envoi Telegram: %s", e)
+        if len(errors) < len(results):
+            logger.info("Notification Telegram envoyée (%d)", len(results) - len(errors))
+        return not errors
     except Exception as e:
         logger.exception("Erreur envoi Telegram: %s", e)
         return False
@@ -317,47 +852,73 @@ def build_telegram_message(trade: dict) -> str:
     )
 
 
-def run_cycle() -> None:
+async def run_cycle(exchange: ccxt_a.Exchange) -> None:
     """
     Une itération :
     - S'il existe un trade OPEN : mise à jour du Current_SL (trailing 3×ATR) à chaque bougie 4H,
       ou clôture si low <= Current_SL.
     - Sinon : détection signal (SuperTrend Daily Long + EMA50 + RSI cross 45), ajout CSV + Telegram.
+    Les notifications du cycle sont regroupées et envoyées ensemble en fin de cycle.
     """
-    exchange = get_exchange()
-    df_4h, df_1d, prix_actuel, ok = get_indicators(exchange)
+    messages: List[str] = []
+    try:
+        await _evaluate_cycle(exchange, messages)
+    finally:
+        if messages:
+            await send_telegram_messages(messages)
+
+
+async def _evaluate_cycle(exchange: ccxt_a.Exchange, messages: List[str]) -> None:
+    """
+    Corps de run_cycle : met à jour journal / état et ajoute les notifications à `messages`.
+    Trade ouvert : seul le 4H est récupéré (le trailing n'utilise pas le Daily). Sinon le filtre
+    SuperTrend Daily est évalué d'abord et le 4H n'est récupéré que s'il est Long.
+    """
+    await refresh_markets(exchange)
+    state = load_indicator_state()
+    open_trade = get_open_trade_from_csv()
+
+    if open_trade is None:
+        bars_1d, ok = await get_daily_state(exchange, state)
+        if not ok:
+            logger.warning("Cycle ignoré: données invalides")
+            return
+        if not is_supertrend_daily_long(bars_1d):
+            logger.info("Filtre Daily: SuperTrend (10,3) non Long - pas de signal")
+            return
+
+    bars_4h, prix_actuel, ok = await get_4h_state(exchange, state)
     if not ok or prix_actuel is None:
         logger.warning("Cycle ignoré: données invalides")
         return
 
-    open_trade = get_open_trade_from_csv()
-
     if open_trade is not None:
         # Suivi du trade ouvert : dernière bougie 4H close + ATR pour trailing
-        if df_4h.empty or len(df_4h) < 2:
+        if not bars_4h or len(bars_4h["close"]) < 2:
             return
-        last = df_4h.iloc[-1]
         current_sl = float(open_trade.get("Current_SL", open_trade.get("SL", 0)))
-        low = last["low"]
-        close = last["close"]
-        atr_val = last.get("atr")
-        if pd.isna(atr_val) or atr_val <= 0:
+        low = float(bars_4h["low"][-1])
+        close = float(bars_4h["close"][-1])
+        atr_val = float(bars_4h["atr"][-1])
+        if math.isnan(atr_val) or atr_val <= 0:
             return
         # Sortie : pendant la bougie, si low <= current_sl → clôture
         if low <= current_sl:
-            update_csv_open_trade(current_sl, "CLOSED_SL")
+            if not update_csv_open_trade(open_trade, current_sl, "CLOSED_SL"):
+                return
             logger.info("Trade fermé (Trailing Stop / SL): low=%.2f <= Current_SL=%.2f", low, current_sl)
             message = (
                 "🚨 **SORTIE DE TRADE - BTC/USDT**\n"
                 f"Le prix ({low}) a touché le Trailing Stop ({current_sl}).\n\n"
                 "👉 Ferme ta position manuellement sur l'exchange !"
             )
-            asyncio.run(send_telegram_message(message))
+            messages.append(message)
             return
         # Remonter le trailing : close - 3*ATR (ne monte jamais)
         candidate_sl = float(close - ATR_TRAILING_MULTIPLIER * atr_val)
         entry = float(open_trade["Prix_Entree"])
         old_sl = current_sl
+        msg = None
         if candidate_sl > current_sl and candidate_sl < close:
             current_sl = round(candidate_sl, 2)
             logger.info("Trailing SL mis à jour: %.2f (close 4H=%.2f, ATR=%.2f)", current_sl, close, atr_val)
@@ -369,41 +930,71 @@ def run_cycle() -> None:
                     f"Nouveau SL : {current_sl}\n"
                     f"Prix actuel : {prix_actuel}"
                 )
-                asyncio.run(send_telegram_message(msg))
-        update_csv_open_trade(current_sl, "OPEN")
+        if update_csv_open_trade(open_trade, current_sl, "OPEN") and msg is not None:
+            messages.append(msg)
         return
 
-    if not check_signal(df_4h, df_1d, prix_actuel):
+    if not check_signal(bars_4h, bars_1d, prix_actuel):
         logger.info("Aucun signal (prix=%.2f)", prix_actuel)
         return
 
-    trade = compute_trade_values(prix_actuel, df_4h)
+    trade = compute_trade_values(prix_actuel, bars_4h["low"])
     if trade is None:
         return
     trade["Date"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    update_csv_new_trade(trade)
-    message = build_telegram_message(trade)
-    asyncio.run(send_telegram_message(message))
+    if update_csv_new_trade(trade):
+        messages.append(build_telegram_message(trade))
+
+
+async def run_once() -> None:
+    """Un cycle sur une instance d'exchange unique ; exchange et Bot Telegram fermés en sortie."""
+    exchange = get_exchange()
+    try:
+        await run_cycle(exchange)
+    finally:
+        await exchange.close()
+        await close_telegram_bot()
+
+
+def seconds_until_next_close(interval_seconds: int = 4 * 3600, now: Optional[float] = None) -> float:
+    """
+    Délai jusqu'à la prochaine clôture de bougie (frontières UTC multiples de `interval_seconds`),
+    plus 2 à 5 s de marge aléatoire pour que l'exchange ait publié la bougie close.
+    """
+    now = time.time() if now is None else now
+    next_close = (now // interval_seconds + 1) * interval_seconds
+    return max(0.0, next_close + random.uniform(2, 5) - now)
+
+
+async def _main_loop(interval_seconds: int) -> None:
+    """Boucle asynchrone : exchange et Bot Telegram réutilisés d'un cycle à l'autre, fermés à l'arrêt."""
+    exchange = get_exchange()
+    logger.info("Démarrage surveillance BTC/USDT (4H) - réveil à chaque clôture (%s s)", interval_seconds)
+    try:
+        while True:
+            try:
+                await run_cycle(exchange)
+            except Exception as e:
+                logger.exception("Erreur dans le cycle (script continue): %s", e)
+            delay = seconds_until_next_close(interval_seconds)
+            logger.info("Prochaine exécution dans %d secondes", delay)
+            await asyncio.sleep(delay)
+    finally:
+        await exchange.close()
+        await close_telegram_bot()
 
 
 def main_loop(interval_seconds: int = 4 * 3600) -> None:
     """
-    Boucle principale : exécution toutes les 4 heures.
+    Boucle principale : exécution à chaque clôture de bougie 4H (00h, 04h, 08h… UTC).
     Gestion des exceptions pour éviter l'arrêt en cas de coupure internet ou erreur API.
     """
-    # logger.info("Démarrage surveillance BTC/USDT (4H) - intervalle %s s", interval_seconds)
-    # while True:
-    try:
-        run_cycle()
-    except Exception as e:
-        logger.exception("Erreur dans le cycle (script continue): %s", e)
-    # logger.info("Prochaine exécution dans %d secondes", interval_seconds)
-        # time.sleep(interval_seconds)
+    asyncio.run(_main_loop(interval_seconds))
 
 
 if __name__ == "__main__":
     # Option : une seule exécution pour tests
     if len(sys.argv) > 1 and sys.argv[1] == "--once":
-        run_cycle()
+        asyncio.run(run_once())
     else:
         main_loop(interval_seconds=4 * 3600)